@@ -1,9 +1,12 @@
 # Copyright (c) 2023 Kyle Schouviller (https://github.com/kyle0654), 2023 Kent Keirsey (https://github.com/hipsterusername), 2023 Lincoln D. Stein
 
 import pathlib
-from typing import Annotated, List, Literal, Optional, Union
+import threading
+import time
+from typing import Annotated, Any, Callable, List, Literal, Optional, TypeVar, Union
 
 from fastapi import Body, Path, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.routing import APIRouter
 from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from starlette.exceptions import HTTPException
@@ -21,46 +24,110 @@ from ..dependencies import ApiDependencies
 
 models_router = APIRouter(prefix="/v1/models", tags=["models"])
 
-UpdateModelResponse = Union[tuple(OPENAPI_MODEL_CONFIGS)]
-UpdateModelResponseValidator = TypeAdapter(UpdateModelResponse)
+# The union of every model config is large; build it and its validator once and share them
+OpenAPIModelConfig = Union[tuple(OPENAPI_MODEL_CONFIGS)]
+OpenAPIModelConfigValidator = TypeAdapter(OpenAPIModelConfig)
 
-ImportModelResponse = Union[tuple(OPENAPI_MODEL_CONFIGS)]
-ImportModelResponseValidator = TypeAdapter(ImportModelResponse)
+UpdateModelResponse = OpenAPIModelConfig
+UpdateModelResponseValidator = OpenAPIModelConfigValidator
 
-ConvertModelResponse = Union[tuple(OPENAPI_MODEL_CONFIGS)]
-ConvertModelResponseValidator = TypeAdapter(ConvertModelResponse)
+ImportModelResponse = OpenAPIModelConfig
+ImportModelResponseValidator = OpenAPIModelConfigValidator
 
-MergeModelResponse = Union[tuple(OPENAPI_MODEL_CONFIGS)]
-ImportModelAttributes = Union[tuple(OPENAPI_MODEL_CONFIGS)]
+ConvertModelResponse = OpenAPIModelConfig
+ConvertModelResponseValidator = OpenAPIModelConfigValidator
+
+MergeModelResponse = OpenAPIModelConfig
+ImportModelAttributes = OpenAPIModelConfig
+
+PREDICTION_TYPES = {x.value: x for x in SchedulerPredictionType}
+
+# The legacy ModelManager is not thread-safe: listing iterates its models dict while rename/update/delete
+# mutate it and rewrite models.yaml. Calls from these routes run in the threadpool, so serialize them.
+_model_manager_lock = threading.Lock()
+
+T = TypeVar("T")
+
+
+async def _run_model_manager(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking model manager call in the threadpool, holding the model manager lock."""
+
+    def locked_call() -> T:
+        with _model_manager_lock:
+            return func(*args, **kwargs)
+
+    return await run_in_threadpool(locked_call)
 
 
 class ModelsList(BaseModel):
-    models: list[Union[tuple(OPENAPI_MODEL_CONFIGS)]]
+    models: list[OpenAPIModelConfig]
 
     model_config = ConfigDict(use_enum_values=True)
 
 
 ModelsListValidator = TypeAdapter(ModelsList)
 
+# Results of model_manager.list_models(), keyed on (base_model, model_type). The installed
+# models only change through the routes below, which clear the cache; the TTL catches
+# changes made outside of this router (e.g. by the model installer).
+MODELS_CACHE_TTL = 60.0
+_models_cache: dict[tuple[Optional[BaseModelType], Optional[ModelType]], tuple[float, list[dict]]] = {}
+# Bumped on every invalidation, so a listing that was in flight when the models changed is not cached.
+_models_cache_generation = 0
+
+
+async def _list_models(base_model: Optional[BaseModelType], model_type: Optional[ModelType]) -> list[dict]:
+    key = (base_model, model_type)
+    cached = _models_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < MODELS_CACHE_TTL:
+        return cached[1]
+    generation = _models_cache_generation
+    models = await _run_model_manager(
+        ApiDependencies.invoker.services.model_manager.list_models, base_model, model_type
+    )
+    if generation == _models_cache_generation:
+        _models_cache[key] = (time.monotonic(), models)
+    return models
+
+
+def _invalidate_models_cache() -> None:
+    global _models_cache_generation
+    _models_cache_generation += 1
+    _models_cache.clear()
+
+
+async def _run_model_manager_mutation(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a model manager call that changes the installed models, then invalidate the models cache.
+
+    The cache is invalidated even if the call raises, since it may already have changed things on disk
+    (e.g. an import that installed some models before failing).
+    """
+    try:
+        return await _run_model_manager(func, *args, **kwargs)
+    finally:
+        _invalidate_models_cache()
+
 
 @models_router.get(
     "/",
     operation_id="list_models",
     responses={200: {"model": ModelsList}},
+    response_model=ModelsList,
 )
 async def list_models(
     base_models: Optional[List[BaseModelType]] = Query(default=None, description="Base models to include"),
     model_type: Optional[ModelType] = Query(default=None, description="The type of model to get"),
-) -> ModelsList:
+) -> Response:
     """Gets a list of models"""
     if base_models and len(base_models) > 0:
         models_raw = []
         for base_model in base_models:
-            models_raw.extend(ApiDependencies.invoker.services.model_manager.list_models(base_model, model_type))
+            models_raw.extend(await _list_models(base_model, model_type))
     else:
-        models_raw = ApiDependencies.invoker.services.model_manager.list_models(None, model_type)
+        models_raw = await _list_models(None, model_type)
     models = ModelsListValidator.validate_python({"models": models_raw})
-    return models
+    # The list can be large; serialize it with pydantic-core instead of jsonable_encoder + json.dumps
+    return Response(content=models.model_dump_json(), media_type="application/json")
 
 
 @models_router.patch(
@@ -79,13 +146,15 @@ async def update_model(
     base_model: BaseModelType = Path(description="Base model"),
     model_type: ModelType = Path(description="The type of model"),
     model_name: str = Path(description="model name"),
-    info: Union[tuple(OPENAPI_MODEL_CONFIGS)] = Body(description="Model configuration"),
+    info: OpenAPIModelConfig = Body(description="Model configuration"),
 ) -> UpdateModelResponse:
     """Update model contents with a new config. If the model name or base fields are changed, then the model is renamed."""
     logger = ApiDependencies.invoker.services.logger
+    model_manager = ApiDependencies.invoker.services.model_manager
 
     try:
-        previous_info = ApiDependencies.invoker.services.model_manager.list_model(
+        previous_info = await _run_model_manager(
+            model_manager.list_model,
             model_name=model_name,
             base_model=base_model,
             model_type=model_type,
@@ -93,7 +162,8 @@ async def update_model(
 
         # rename operation requested
         if info.model_name != model_name or info.base_model != base_model:
-            ApiDependencies.invoker.services.model_manager.rename_model(
+            await _run_model_manager_mutation(
+                model_manager.rename_model,
                 base_model=base_model,
                 model_type=model_type,
                 model_name=model_name,
@@ -104,7 +174,8 @@ async def update_model(
             # update information to support an update of attributes
             model_name = info.model_name
             base_model = info.base_model
-            new_info = ApiDependencies.invoker.services.model_manager.list_model(
+            new_info = await _run_model_manager(
+                model_manager.list_model,
                 model_name=model_name,
                 base_model=base_model,
                 model_type=model_type,
@@ -118,14 +189,16 @@ async def update_model(
         info_dict = info.model_dump()
         info_dict = {x: info_dict[x] if info_dict[x] else None for x in info_dict.keys()}
 
-        ApiDependencies.invoker.services.model_manager.update_model(
+        await _run_model_manager_mutation(
+            model_manager.update_model,
             model_name=model_name,
             base_model=base_model,
             model_type=model_type,
             model_attributes=info_dict,
         )
 
-        model_raw = ApiDependencies.invoker.services.model_manager.list_model(
+        model_raw = await _run_model_manager(
+            model_manager.list_model,
             model_name=model_name,
             base_model=base_model,
             model_type=model_type,
@@ -167,13 +240,15 @@ async def import_model(
 
     location = location.strip("\"' ")
     items_to_import = {location}
-    prediction_types = {x.value: x for x in SchedulerPredictionType}
+    scheduler_prediction_type = PREDICTION_TYPES.get(prediction_type) if prediction_type else None
     logger = ApiDependencies.invoker.services.logger
+    model_manager = ApiDependencies.invoker.services.model_manager
 
     try:
-        installed_models = ApiDependencies.invoker.services.model_manager.heuristic_import(
+        installed_models = await _run_model_manager_mutation(
+            model_manager.heuristic_import,
             items_to_import=items_to_import,
-            prediction_type_helper=lambda x: prediction_types.get(prediction_type),
+            prediction_type_helper=lambda x: scheduler_prediction_type,
         )
         info = installed_models.get(location)
 
@@ -182,8 +257,11 @@ async def import_model(
             raise HTTPException(status_code=415)
 
         logger.info(f"Successfully imported {location}, got {info}")
-        model_raw = ApiDependencies.invoker.services.model_manager.list_model(
-            model_name=info.name, base_model=info.base_model, model_type=info.model_type
+        model_raw = await _run_model_manager(
+            model_manager.list_model,
+            model_name=info.name,
+            base_model=info.base_model,
+            model_type=info.model_type,
         )
         return ImportModelResponseValidator.validate_python(model_raw)
 
@@ -211,21 +289,24 @@ async def import_model(
     response_model=ImportModelResponse,
 )
 async def add_model(
-    info: Union[tuple(OPENAPI_MODEL_CONFIGS)] = Body(description="Model configuration"),
+    info: OpenAPIModelConfig = Body(description="Model configuration"),
 ) -> ImportModelResponse:
     """Add a model using the configuration information appropriate for its type. Only local models can be added by path"""
 
     logger = ApiDependencies.invoker.services.logger
+    model_manager = ApiDependencies.invoker.services.model_manager
 
     try:
-        ApiDependencies.invoker.services.model_manager.add_model(
+        await _run_model_manager_mutation(
+            model_manager.add_model,
             info.model_name,
             info.base_model,
             info.model_type,
             model_attributes=info.model_dump(),
         )
         logger.info(f"Successfully added {info.model_name}")
-        model_raw = ApiDependencies.invoker.services.model_manager.list_model(
+        model_raw = await _run_model_manager(
+            model_manager.list_model,
             model_name=info.model_name,
             base_model=info.base_model,
             model_type=info.model_type,
@@ -258,8 +339,11 @@ async def delete_model(
     logger = ApiDependencies.invoker.services.logger
 
     try:
-        ApiDependencies.invoker.services.model_manager.del_model(
-            model_name, base_model=base_model, model_type=model_type
+        await _run_model_manager_mutation(
+            ApiDependencies.invoker.services.model_manager.del_model,
+            model_name,
+            base_model=base_model,
+            model_type=model_type,
         )
         logger.info(f"Deleted model: {model_name}")
         return Response(status_code=204)
@@ -292,14 +376,18 @@ async def convert_model(
     try:
         logger.info(f"Converting model: {model_name}")
         dest = pathlib.Path(convert_dest_directory) if convert_dest_directory else None
-        ApiDependencies.invoker.services.model_manager.convert_model(
+        await _run_model_manager_mutation(
+            ApiDependencies.invoker.services.model_manager.convert_model,
             model_name,
             base_model=base_model,
             model_type=model_type,
             convert_dest_directory=dest,
         )
-        model_raw = ApiDependencies.invoker.services.model_manager.list_model(
-            model_name, base_model=base_model, model_type=model_type
+        model_raw = await _run_model_manager(
+            ApiDependencies.invoker.services.model_manager.list_model,
+            model_name,
+            base_model=base_model,
+            model_type=model_type,
         )
         response = ConvertModelResponseValidator.validate_python(model_raw)
     except ModelNotFoundException as e:
@@ -327,7 +415,8 @@ async def search_for_models(
             status_code=404,
             detail=f"The search path '{search_path}' does not exist or is not directory",
         )
-    return ApiDependencies.invoker.services.model_manager.search_for_models(search_path)
+    # Walks the directory tree without touching the installed models, so it doesn't need the model manager lock
+    return await run_in_threadpool(ApiDependencies.invoker.services.model_manager.search_for_models, search_path)
 
 
 @models_router.get(
@@ -341,7 +430,7 @@ async def search_for_models(
 )
 async def list_ckpt_configs() -> List[pathlib.Path]:
     """Return a list of the legacy checkpoint configuration files stored in `ROOT/configs/stable-diffusion`, relative to ROOT."""
-    return ApiDependencies.invoker.services.model_manager.list_checkpoint_configs()
+    return await run_in_threadpool(ApiDependencies.invoker.services.model_manager.list_checkpoint_configs)
 
 
 @models_router.post(
@@ -356,7 +445,7 @@ async def list_ckpt_configs() -> List[pathlib.Path]:
 async def sync_to_config() -> bool:
     """Call after making changes to models.yaml, autoimport directories or models directory to synchronize
     in-memory data structures with disk data structures."""
-    ApiDependencies.invoker.services.model_manager.sync_to_config()
+    await _run_model_manager_mutation(ApiDependencies.invoker.services.model_manager.sync_to_config)
     return True
 
 
@@ -402,7 +491,8 @@ async def merge_models(
             f"Merging models: {body.model_names} into {body.merge_dest_directory or '<MODELS>'}/{body.merged_model_name}"
         )
         dest = pathlib.Path(body.merge_dest_directory) if body.merge_dest_directory else None
-        result = ApiDependencies.invoker.services.model_manager.merge_models(
+        result = await _run_model_manager_mutation(
+            ApiDependencies.invoker.services.model_manager.merge_models,
             model_names=body.model_names,
             base_model=base_model,
             merged_model_name=body.merged_model_name or "+".join(body.model_names),
@@ -411,7 +501,8 @@ async def merge_models(
             force=body.force,
             merge_dest_directory=dest,
         )
-        model_raw = ApiDependencies.invoker.services.model_manager.list_model(
+        model_raw = await _run_model_manager(
+            ApiDependencies.invoker.services.model_manager.list_model,
             result.name,
             base_model=base_model,
             model_type=ModelType.Main,
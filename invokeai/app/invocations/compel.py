@@ -1,9 +1,17 @@
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Optional, Union
 
 import torch
 from compel import Compel, ReturnedEmbeddingsType
-from compel.prompt_parser import Blend, Conjunction, CrossAttentionControlSubstitute, FlattenedPrompt, Fragment
+from compel.prompt_parser import (
+    Blend,
+    Conjunction,
+    CrossAttentionControlSubstitute,
+    FlattenedPrompt,
+    Fragment,
+    PromptParser,
+)
 
 from invokeai.app.invocations.primitives import ConditioningField, ConditioningOutput
 from invokeai.app.shared.fields import FieldDescriptions
@@ -102,10 +110,7 @@ class CompelInvocation(BaseInvocation):
                     )
                 )
             except ModelNotFoundException:
-                # print(e)
-                # import traceback
-                # print(traceback.format_exc())
-                print(f'Warn: trigger: "{trigger}" not found')
+                context.services.logger.warning(f'trigger: "{trigger}" not found')
 
         with (
             ModelPatcher.apply_ti(tokenizer_info.context.model, text_encoder_info.context.model, ti_list) as (
@@ -126,7 +131,7 @@ class CompelInvocation(BaseInvocation):
                 truncate_long_prompts=False,
             )
 
-            conjunction = Compel.parse_prompt_string(self.prompt)
+            conjunction = parse_prompt_string(self.prompt)
 
             if context.services.configuration.log_tokenization:
                 log_tokenization_for_conjunction(conjunction, tokenizer)
@@ -225,10 +230,7 @@ class SDXLPromptInvocationBase:
                     )
                 )
             except ModelNotFoundException:
-                # print(e)
-                # import traceback
-                # print(traceback.format_exc())
-                print(f'Warn: trigger: "{trigger}" not found')
+                context.services.logger.warning(f'trigger: "{trigger}" not found')
 
         with (
             ModelPatcher.apply_ti(tokenizer_info.context.model, text_encoder_info.context.model, ti_list) as (
@@ -251,7 +253,7 @@ class SDXLPromptInvocationBase:
                 requires_pooled=get_pooled,
             )
 
-            conjunction = Compel.parse_prompt_string(prompt)
+            conjunction = parse_prompt_string(prompt)
 
             if context.services.configuration.log_tokenization:
                 # TODO: better logging for and syntax
@@ -458,34 +460,49 @@ class ClipSkipInvocation(BaseInvocation):
         )
 
 
+@lru_cache(maxsize=1)
+def _get_prompt_parser() -> PromptParser:
+    return PromptParser()
+
+
+@lru_cache(maxsize=128)
+def parse_prompt_string(prompt: str) -> Conjunction:
+    """Same as Compel.parse_prompt_string(), but reuses one PromptParser rather than rebuilding its grammar per call.
+
+    Results are memoized on the prompt string, so the returned Conjunction is shared and must not be mutated.
+    """
+    return _get_prompt_parser().parse_conjunction(prompt)
+
+
 def get_max_token_count(
     tokenizer,
     prompt: Union[FlattenedPrompt, Blend, Conjunction],
     truncate_if_too_long=False,
 ) -> int:
-    if type(prompt) is Blend:
+    if isinstance(prompt, Blend):
         blend: Blend = prompt
-        return max([get_max_token_count(tokenizer, p, truncate_if_too_long) for p in blend.prompts])
-    elif type(prompt) is Conjunction:
+        return max(get_max_token_count(tokenizer, p, truncate_if_too_long) for p in blend.prompts)
+    elif isinstance(prompt, Conjunction):
         conjunction: Conjunction = prompt
-        return sum([get_max_token_count(tokenizer, p, truncate_if_too_long) for p in conjunction.prompts])
+        return sum(get_max_token_count(tokenizer, p, truncate_if_too_long) for p in conjunction.prompts)
     else:
         return len(get_tokens_for_prompt_object(tokenizer, prompt, truncate_if_too_long))
 
 
 def get_tokens_for_prompt_object(tokenizer, parsed_prompt: FlattenedPrompt, truncate_if_too_long=True) -> List[str]:
-    if type(parsed_prompt) is Blend:
+    if isinstance(parsed_prompt, Blend):
         raise ValueError("Blend is not supported here - you need to get tokens for each of its .children")
 
-    text_fragments = [
-        (
-            x.text
-            if type(x) is Fragment
-            else (" ".join([f.text for f in x.original]) if type(x) is CrossAttentionControlSubstitute else str(x))
-        )
-        for x in parsed_prompt.children
-    ]
-    text = " ".join(text_fragments)
+    def iter_fragment_texts():
+        for x in parsed_prompt.children:
+            if isinstance(x, Fragment):
+                yield x.text
+            elif isinstance(x, CrossAttentionControlSubstitute):
+                yield from (f.text for f in x.original)
+            else:
+                yield str(x)
+
+    text = " ".join(iter_fragment_texts())
     tokens = tokenizer.tokenize(text)
     if truncate_if_too_long:
         max_tokens_length = tokenizer.model_max_length - 2  # typically 75
@@ -505,7 +522,7 @@ def log_tokenization_for_conjunction(c: Conjunction, tokenizer, display_label_pr
 
 def log_tokenization_for_prompt_object(p: Union[Blend, FlattenedPrompt], tokenizer, display_label_prefix=None):
     display_label_prefix = display_label_prefix or ""
-    if type(p) is Blend:
+    if isinstance(p, Blend):
         blend: Blend = p
         for i, c in enumerate(blend.prompts):
             log_tokenization_for_prompt_object(
@@ -513,13 +530,13 @@ def log_tokenization_for_prompt_object(p: Union[Blend, FlattenedPrompt], tokeniz
                 tokenizer,
                 display_label_prefix=f"{display_label_prefix}(blend part {i + 1}, weight={blend.weights[i]})",
             )
-    elif type(p) is FlattenedPrompt:
+    elif isinstance(p, FlattenedPrompt):
         flattened_prompt: FlattenedPrompt = p
         if flattened_prompt.wants_cross_attention_control:
             original_fragments = []
             edited_fragments = []
             for f in flattened_prompt.children:
-                if type(f) is CrossAttentionControlSubstitute:
+                if isinstance(f, CrossAttentionControlSubstitute):
                     original_fragments += f.original
                     edited_fragments += f.edited
                 else:
@@ -548,26 +565,20 @@ def log_tokenization_for_text(text, tokenizer, display_label=None, truncate_if_t
     # usually tokens have '</w>' to indicate end-of-word,
     # but for readability it has been replaced with ' '
     """
-    tokens = tokenizer.tokenize(text)
-    tokenized = ""
-    discarded = ""
-    usedTokens = 0
+    tokens = [token.replace("</w>", " ") for token in tokenizer.tokenize(text)]
     totalTokens = len(tokens)
+    max_length = tokenizer.model_max_length if truncate_if_too_long else totalTokens
+    kept, over = tokens[:max_length], tokens[max_length:]
+    usedTokens = len(kept)
 
-    for i in range(0, totalTokens):
-        token = tokens[i].replace("</w>", " ")
-        # alternate color
-        s = (usedTokens % 6) + 1
-        if truncate_if_too_long and i >= tokenizer.model_max_length:
-            discarded = discarded + f"\x1b[0;3{s};40m{token}"
-        else:
-            tokenized = tokenized + f"\x1b[0;3{s};40m{token}"
-            usedTokens += 1
+    # alternate color
+    tokenized = "".join(f"\x1b[0;3{(i % 6) + 1};40m{token}" for i, token in enumerate(kept))
+    discarded = "".join(f"\x1b[0;3{(usedTokens % 6) + 1};40m{token}" for token in over)
 
     if usedTokens > 0:
         print(f'\n>> [TOKENLOG] Tokens {display_label or ""} ({usedTokens}):')
         print(f"{tokenized}\x1b[0m")
 
-    if discarded != "":
+    if discarded:
         print(f"\n>> [TOKENLOG] Tokens Discarded ({totalTokens - usedTokens}):")
         print(f"{discarded}\x1b[0m")
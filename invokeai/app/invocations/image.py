@@ -1,5 +1,6 @@
 # Copyright (c) 2022 Kyle Schouviller (https://github.com/kyle0654)
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Literal, Optional
 
@@ -720,10 +721,15 @@ class ImageNSFWBlurInvocation(BaseInvocation, WithMetadata):
         )
 
     def _get_caution_img(self) -> Image.Image:
-        import invokeai.app.assets.images as image_assets
+        return _load_caution_img()
 
-        caution = Image.open(Path(image_assets.__path__[0]) / "caution.png")
-        return caution.resize((caution.width // 2, caution.height // 2))
+
+@lru_cache(maxsize=1)
+def _load_caution_img() -> Image.Image:
+    import invokeai.app.assets.images as image_assets
+
+    caution = Image.open(Path(image_assets.__path__[0]) / "caution.png")
+    return caution.resize((caution.width // 2, caution.height // 2))
 
 
 @invocation(
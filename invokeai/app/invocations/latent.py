@@ -6,7 +6,6 @@ from functools import singledispatchmethod
 from typing import List, Literal, Optional, Union
 
 import einops
-import numpy as np
 import torch
 import torchvision.transforms as T
 from diffusers import AutoencoderKL, AutoencoderTiny
@@ -1092,6 +1091,33 @@ class ImageToLatentsInvocation(BaseInvocation):
         return vae.encode(image_tensor).latents
 
 
+def slerp(t: float, v0: torch.Tensor, v1: torch.Tensor, DOT_THRESHOLD: float = 0.9995) -> torch.Tensor:
+    """
+    Spherical linear interpolation
+    Args:
+        t (float): Float value between 0.0 and 1.0
+        v0 (torch.Tensor): Starting vector
+        v1 (torch.Tensor): Final vector
+        DOT_THRESHOLD (float): Threshold for considering the two vectors as
+                            colineal. Not recommended to alter this.
+    Returns:
+        v2 (torch.Tensor): Interpolation vector between v0 and v1
+    """
+    v0_norm = torch.linalg.vector_norm(v0, dtype=torch.float32)
+    v1_norm = torch.linalg.vector_norm(v1, dtype=torch.float32)
+    dot = (torch.sum(v0 * v1, dtype=torch.float32) / (v0_norm * v1_norm)).item()
+    if abs(dot) > DOT_THRESHOLD:
+        return (1 - t) * v0 + t * v1
+
+    theta_0 = math.acos(dot)
+    sin_theta_0 = math.sin(theta_0)
+    theta_t = theta_0 * t
+    sin_theta_t = math.sin(theta_t)
+    s0 = math.sin(theta_0 - theta_t) / sin_theta_0
+    s1 = sin_theta_t / sin_theta_0
+    return s0 * v0 + s1 * v1
+
+
 @invocation(
     "lblend",
     title="Blend Latents",
@@ -1122,43 +1148,6 @@ class BlendLatentsInvocation(BaseInvocation):
         # TODO:
         device = choose_torch_device()
 
-        def slerp(t, v0, v1, DOT_THRESHOLD=0.9995):
-            """
-            Spherical linear interpolation
-            Args:
-                t (float/np.ndarray): Float value between 0.0 and 1.0
-                v0 (np.ndarray): Starting vector
-                v1 (np.ndarray): Final vector
-                DOT_THRESHOLD (float): Threshold for considering the two vectors as
-                                    colineal. Not recommended to alter this.
-            Returns:
-                v2 (np.ndarray): Interpolation vector between v0 and v1
-            """
-            inputs_are_torch = False
-            if not isinstance(v0, np.ndarray):
-                inputs_are_torch = True
-                v0 = v0.detach().cpu().numpy()
-            if not isinstance(v1, np.ndarray):
-                inputs_are_torch = True
-                v1 = v1.detach().cpu().numpy()
-
-            dot = np.sum(v0 * v1 / (np.linalg.norm(v0) * np.linalg.norm(v1)))
-            if np.abs(dot) > DOT_THRESHOLD:
-                v2 = (1 - t) * v0 + t * v1
-            else:
-                theta_0 = np.arccos(dot)
-                sin_theta_0 = np.sin(theta_0)
-                theta_t = theta_0 * t
-                sin_theta_t = np.sin(theta_t)
-                s0 = np.sin(theta_0 - theta_t) / sin_theta_0
-                s1 = sin_theta_t / sin_theta_0
-                v2 = s0 * v0 + s1 * v1
-
-            if inputs_are_torch:
-                v2 = torch.from_numpy(v2).to(device)
-
-            return v2
-
         # blend
         blended_latents = slerp(self.alpha, latents_a, latents_b)
 
@@ -2,6 +2,7 @@
 
 import copy
 import itertools
+from functools import lru_cache
 from typing import Annotated, Any, Optional, Union, get_args, get_origin, get_type_hints
 
 import networkx as nx
@@ -47,16 +48,25 @@ class Edge(BaseModel):
     destination: EdgeConnection = Field(description="The connection for the edge's to node and field")
 
 
+# Invocation classes are fixed once registered, so their type hints are resolved once per class
+@lru_cache(maxsize=None)
+def _get_output_type_hints(node_type: type[BaseInvocation]) -> dict[str, Any]:
+    return get_type_hints(node_type.get_output_annotation())
+
+
+@lru_cache(maxsize=None)
+def _get_input_type_hints(node_type: type[BaseInvocation]) -> dict[str, Any]:
+    return get_type_hints(node_type)
+
+
 def get_output_field(node: BaseInvocation, field: str) -> Any:
-    node_type = type(node)
-    node_outputs = get_type_hints(node_type.get_output_annotation())
+    node_outputs = _get_output_type_hints(type(node))
     node_output_field = node_outputs.get(field) or None
     return node_output_field
 
 
 def get_input_field(node: BaseInvocation, field: str) -> Any:
-    node_type = type(node)
-    node_inputs = get_type_hints(node_type)
+    node_inputs = _get_input_type_hints(type(node))
     node_input_field = node_inputs.get(field) or None
     return node_input_field
 
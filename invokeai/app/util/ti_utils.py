@@ -1,8 +1,7 @@
 import re
 
+TI_TRIGGER_RE = re.compile(r"<[a-zA-Z0-9., _-]+>")
+
 
 def extract_ti_triggers_from_prompt(prompt: str) -> list[str]:
-    ti_triggers = []
-    for trigger in re.findall(r"<[a-zA-Z0-9., _-]+>", prompt):
-        ti_triggers.append(trigger)
-    return ti_triggers
+    return TI_TRIGGER_RE.findall(prompt)
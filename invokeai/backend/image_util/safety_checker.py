@@ -3,8 +3,9 @@ This module defines a singleton object, "safety_checker" that
 wraps the safety_checker model. It respects the global "nsfw_checker"
 configuration variable, that allows the checker to be supressed.
 """
-import numpy as np
+from diffusers.pipelines.stable_diffusion.safety_checker import StableDiffusionSafetyChecker
 from PIL import Image
+from transformers import AutoFeatureExtractor
 
 import invokeai.backend.util.logging as logger
 from invokeai.app.services.config import InvokeAIAppConfig
@@ -32,9 +33,6 @@ class SafetyChecker:
 
         if config.nsfw_checker:
             try:
-                from diffusers.pipelines.stable_diffusion.safety_checker import StableDiffusionSafetyChecker
-                from transformers import AutoFeatureExtractor
-
                 cls.safety_checker = StableDiffusionSafetyChecker.from_pretrained(config.models_path / CHECKER_PATH)
                 cls.feature_extractor = AutoFeatureExtractor.from_pretrained(config.models_path / CHECKER_PATH)
                 logger.info("NSFW checker initialized")
@@ -58,8 +56,8 @@ class SafetyChecker:
         features = cls.feature_extractor([image], return_tensors="pt")
         features.to(device)
         cls.safety_checker.to(device)
-        x_image = np.array(image).astype(np.float32) / 255.0
-        x_image = x_image[None].transpose(0, 3, 1, 2)
+        # The checker only uses `images` to black out flagged entries, and we discard its output
+        # images, so hand it the extractor's pixel values rather than building another copy.
         with SilenceWarnings():
-            checked_image, has_nsfw_concept = cls.safety_checker(images=x_image, clip_input=features.pixel_values)
+            _, has_nsfw_concept = cls.safety_checker(images=features.pixel_values, clip_input=features.pixel_values)
         return has_nsfw_concept[0]
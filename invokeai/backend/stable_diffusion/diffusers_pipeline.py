@@ -75,6 +75,18 @@ class AddsMaskLatents:
         model_input, _ = einops.pack([latents, mask, image_latents], "b * h w")
         return model_input
 
+    @staticmethod
+    def pad_with_blank_mask(latents: torch.Tensor) -> torch.Tensor:
+        """Same layout as add_mask_channels() with an all-ones mask and all-zeros image latents.
+
+        Builds the model input in a single allocation, since this runs on every step.
+        """
+        batch_size, channels, height, width = latents.shape
+        model_input = latents.new_zeros((batch_size, 2 * channels + 1, height, width))
+        model_input[:, :channels] = latents
+        model_input[:, channels] = 1
+        return model_input
+
 
 def are_like_tensors(a: torch.Tensor, b: object) -> bool:
     return isinstance(b, torch.Tensor) and (a.size() == b.size())
@@ -654,11 +666,7 @@ class StableDiffusionGeneratorPipeline(StableDiffusionPipeline):
             # FIXME: There are too many layers of functions and we have too many different ways of
             #     overriding things! This should get handled in a way more consistent with the other
             #     use of AddsMaskLatents.
-            latents = AddsMaskLatents(
-                self._unet_forward,
-                mask=torch.ones_like(latents[:1, :1], device=latents.device, dtype=latents.dtype),
-                initial_image_latents=torch.zeros_like(latents[:1], device=latents.device, dtype=latents.dtype),
-            ).add_mask_channels(latents)
+            latents = AddsMaskLatents.pad_with_blank_mask(latents)
 
         # First three args should be positional, not keywords, so torch hooks can see them.
         return self.unet(
@@ -287,51 +287,21 @@ class InvokeAIDiffuserComponent:
         return latents
 
     def _concat_conditionings_for_batch(self, unconditioning, conditioning):
-        def _pad_conditioning(cond, target_len, encoder_attention_mask):
-            conditioning_attention_mask = torch.ones(
-                (cond.shape[0], cond.shape[1]), device=cond.device, dtype=cond.dtype
-            )
-
-            if cond.shape[1] < max_len:
-                conditioning_attention_mask = torch.cat(
-                    [
-                        conditioning_attention_mask,
-                        torch.zeros((cond.shape[0], max_len - cond.shape[1]), device=cond.device, dtype=cond.dtype),
-                    ],
-                    dim=1,
-                )
-
-                cond = torch.cat(
-                    [
-                        cond,
-                        torch.zeros(
-                            (cond.shape[0], max_len - cond.shape[1], cond.shape[2]),
-                            device=cond.device,
-                            dtype=cond.dtype,
-                        ),
-                    ],
-                    dim=1,
-                )
-
-            if encoder_attention_mask is None:
-                encoder_attention_mask = conditioning_attention_mask
-            else:
-                encoder_attention_mask = torch.cat(
-                    [
-                        encoder_attention_mask,
-                        conditioning_attention_mask,
-                    ]
-                )
-
-            return cond, encoder_attention_mask
-
-        encoder_attention_mask = None
-        if unconditioning.shape[1] != conditioning.shape[1]:
-            max_len = max(unconditioning.shape[1], conditioning.shape[1])
-            unconditioning, encoder_attention_mask = _pad_conditioning(unconditioning, max_len, encoder_attention_mask)
-            conditioning, encoder_attention_mask = _pad_conditioning(conditioning, max_len, encoder_attention_mask)
-
-        return torch.cat([unconditioning, conditioning]), encoder_attention_mask
+        if unconditioning.shape[1] == conditioning.shape[1]:
+            return torch.cat([unconditioning, conditioning]), None
+
+        # Zero-pad the shorter conditioning and mask out the padding. Both are written into a single preallocated
+        # batch, instead of padding each with torch.cat and then concatenating the results.
+        max_len = max(unconditioning.shape[1], conditioning.shape[1])
+        uc_count = unconditioning.shape[0]
+        batch_size = uc_count + conditioning.shape[0]
+        both_conditionings = conditioning.new_zeros((batch_size, max_len, conditioning.shape[2]))
+        encoder_attention_mask = conditioning.new_zeros((batch_size, max_len))
+        both_conditionings[:uc_count, : unconditioning.shape[1]] = unconditioning
+        both_conditionings[uc_count:, : conditioning.shape[1]] = conditioning
+        encoder_attention_mask[:uc_count, : unconditioning.shape[1]] = 1
+        encoder_attention_mask[uc_count:, : conditioning.shape[1]] = 1
+        return both_conditionings, encoder_attention_mask
 
     # methods below are called from do_diffusion_step and should be considered private to this class.
 
@@ -1,7 +1,6 @@
 import base64
 import importlib
 import io
-import math
 import multiprocessing as mp
 import os
 import re
@@ -22,8 +21,6 @@ from transformers import logging as transformers_logging
 
 import invokeai.backend.util.logging as logger
 
-from .devices import torch_dtype
-
 
 def log_txt_as_img(wh, xc, size=10):
     # wh a tuple of (width, height)
@@ -210,57 +207,6 @@ def parallel_data_prefetch(
         return gather_res
 
 
-def rand_perlin_2d(shape, res, device, fade=lambda t: 6 * t**5 - 15 * t**4 + 10 * t**3):
-    delta = (res[0] / shape[0], res[1] / shape[1])
-    d = (shape[0] // res[0], shape[1] // res[1])
-
-    grid = (
-        torch.stack(
-            torch.meshgrid(
-                torch.arange(0, res[0], delta[0]),
-                torch.arange(0, res[1], delta[1]),
-                indexing="ij",
-            ),
-            dim=-1,
-        ).to(device)
-        % 1
-    )
-
-    rand_val = torch.rand(res[0] + 1, res[1] + 1)
-
-    angles = 2 * math.pi * rand_val
-    gradients = torch.stack((torch.cos(angles), torch.sin(angles)), dim=-1).to(device)
-
-    def tile_grads(slice1, slice2):
-        return (
-            gradients[slice1[0] : slice1[1], slice2[0] : slice2[1]]
-            .repeat_interleave(d[0], 0)
-            .repeat_interleave(d[1], 1)
-        )
-
-    def dot(grad, shift):
-        return (
-            torch.stack(
-                (
-                    grid[: shape[0], : shape[1], 0] + shift[0],
-                    grid[: shape[0], : shape[1], 1] + shift[1],
-                ),
-                dim=-1,
-            )
-            * grad[: shape[0], : shape[1]]
-        ).sum(dim=-1)
-
-    n00 = dot(tile_grads([0, -1], [0, -1]), [0, 0]).to(device)
-    n10 = dot(tile_grads([1, None], [0, -1]), [-1, 0]).to(device)
-    n01 = dot(tile_grads([0, -1], [1, None]), [0, -1]).to(device)
-    n11 = dot(tile_grads([1, None], [1, None]), [-1, -1]).to(device)
-    t = fade(grid[: shape[0], : shape[1]])
-    noise = math.sqrt(2) * torch.lerp(torch.lerp(n00, n10, t[..., 0]), torch.lerp(n01, n11, t[..., 0]), t[..., 1]).to(
-        device
-    )
-    return noise.to(dtype=torch_dtype(device))
-
-
 def ask_user(question: str, answers: list):
     from itertools import chain, repeat
 
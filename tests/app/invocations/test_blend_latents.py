@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+import torch
+
+from invokeai.app.invocations.latent import slerp
+
+
+def reference_slerp(t, v0, v1, DOT_THRESHOLD=0.9995):
+    """The original numpy implementation of slerp from BlendLatentsInvocation."""
+    v0 = v0.detach().cpu().numpy()
+    v1 = v1.detach().cpu().numpy()
+
+    dot = np.sum(v0 * v1 / (np.linalg.norm(v0) * np.linalg.norm(v1)))
+    if np.abs(dot) > DOT_THRESHOLD:
+        v2 = (1 - t) * v0 + t * v1
+    else:
+        theta_0 = np.arccos(dot)
+        sin_theta_0 = np.sin(theta_0)
+        theta_t = theta_0 * t
+        sin_theta_t = np.sin(theta_t)
+        s0 = np.sin(theta_0 - theta_t) / sin_theta_0
+        s1 = sin_theta_t / sin_theta_0
+        v2 = s0 * v0 + s1 * v1
+
+    return torch.from_numpy(v2)
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float16])
+@pytest.mark.parametrize("colinear", [True, False], ids=["lerp", "slerp"])
+def test_slerp_matches_numpy_reference(dtype: torch.dtype, colinear: bool):
+    """Test that slerp(...) matches the original numpy implementation for both the lerp and the slerp branch."""
+    torch.manual_seed(0)
+    v0 = torch.randn((1, 4, 64, 64)).to(dtype)
+    # A scaled copy of v0 is colinear with it (|dot| > DOT_THRESHOLD), so the lerp branch is taken.
+    v1 = (v0 * 2.0) if colinear else torch.randn((1, 4, 64, 64)).to(dtype)
+
+    result = slerp(0.3, v0, v1)
+    expected = reference_slerp(0.3, v0, v1)
+
+    assert result.dtype == dtype
+    tolerance = 1e-5 if dtype == torch.float32 else 1e-2
+    torch.testing.assert_close(result.float(), expected.float(), rtol=tolerance, atol=tolerance)
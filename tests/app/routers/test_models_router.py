@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import threading
+from types import SimpleNamespace
+
+import pytest
+from starlette.exceptions import HTTPException
+
+from invokeai.app.api.dependencies import ApiDependencies
+from invokeai.app.api.routers import models
+from invokeai.backend.model_management.models import BaseModelType, ModelNotFoundException, ModelType
+
+LORA_CONFIG = {
+    "model_name": "test_lora",
+    "base_model": BaseModelType.StableDiffusion1.value,
+    "model_type": ModelType.Lora.value,
+    "path": "/models/sd-1/lora/test_lora.safetensors",
+    "model_format": "lycoris",
+}
+
+
+class MockModelManager:
+    """Records calls and returns a single LoRA config for every lookup."""
+
+    def __init__(self):
+        self.list_models_calls = 0
+
+    def list_models(self, base_model=None, model_type=None):
+        self.list_models_calls += 1
+        return [LORA_CONFIG]
+
+    def list_model(self, *args, **kwargs):
+        return LORA_CONFIG
+
+    def rename_model(self, *args, **kwargs):
+        pass
+
+    def update_model(self, *args, **kwargs):
+        pass
+
+    def add_model(self, *args, **kwargs):
+        pass
+
+    def del_model(self, *args, **kwargs):
+        pass
+
+    def convert_model(self, *args, **kwargs):
+        pass
+
+    def sync_to_config(self):
+        pass
+
+    def heuristic_import(self, items_to_import, prediction_type_helper=None):
+        return {
+            location: SimpleNamespace(
+                name=LORA_CONFIG["model_name"],
+                base_model=BaseModelType.StableDiffusion1,
+                model_type=ModelType.Lora,
+            )
+            for location in items_to_import
+        }
+
+    def merge_models(self, **kwargs):
+        return SimpleNamespace(name=LORA_CONFIG["model_name"])
+
+
+@pytest.fixture
+def mock_model_manager(monkeypatch: pytest.MonkeyPatch) -> MockModelManager:
+    model_manager = MockModelManager()
+    services = SimpleNamespace(model_manager=model_manager, logger=logging.getLogger(__name__))
+    monkeypatch.setattr(ApiDependencies, "invoker", SimpleNamespace(services=services), raising=False)
+    models._invalidate_models_cache()
+    yield model_manager
+    models._invalidate_models_cache()
+
+
+def test_list_models_is_cached(mock_model_manager: MockModelManager):
+    assert asyncio.run(models._list_models(None, None)) == [LORA_CONFIG]
+    assert asyncio.run(models._list_models(None, None)) == [LORA_CONFIG]
+    assert mock_model_manager.list_models_calls == 1
+
+
+def test_invalidation_during_fetch_is_not_undone(mock_model_manager: MockModelManager):
+    """A listing that was in flight when the cache was invalidated must not store its (stale) result."""
+    fetch_started = threading.Event()
+    release_fetch = threading.Event()
+    list_models = mock_model_manager.list_models
+
+    def slow_list_models(*args, **kwargs):
+        fetch_started.set()
+        assert release_fetch.wait(timeout=5)
+        return list_models(*args, **kwargs)
+
+    mock_model_manager.list_models = slow_list_models
+
+    async def fetch_and_invalidate():
+        fetch = asyncio.create_task(models._list_models(None, None))
+        assert await asyncio.get_running_loop().run_in_executor(None, fetch_started.wait, 5)
+        models._invalidate_models_cache()
+        release_fetch.set()
+        return await fetch
+
+    assert asyncio.run(fetch_and_invalidate()) == [LORA_CONFIG]
+    assert models._models_cache == {}
+
+    # The next listing goes back to the model manager rather than serving the stale result
+    asyncio.run(models._list_models(None, None))
+    assert mock_model_manager.list_models_calls == 2
+
+
+def _lora_config():
+    return models.OpenAPIModelConfigValidator.validate_python(LORA_CONFIG)
+
+
+MUTATING_ROUTES = {
+    "update_model": lambda: models.update_model(
+        base_model=BaseModelType.StableDiffusion1,
+        model_type=ModelType.Lora,
+        model_name=LORA_CONFIG["model_name"],
+        info=_lora_config(),
+    ),
+    "rename_model": lambda: models.update_model(
+        base_model=BaseModelType.StableDiffusion1,
+        model_type=ModelType.Lora,
+        model_name="old_name",
+        info=_lora_config(),
+    ),
+    "import_model": lambda: models.import_model(location=LORA_CONFIG["path"], prediction_type=None),
+    "add_model": lambda: models.add_model(info=_lora_config()),
+    "delete_model": lambda: models.delete_model(
+        base_model=BaseModelType.StableDiffusion1,
+        model_type=ModelType.Lora,
+        model_name=LORA_CONFIG["model_name"],
+    ),
+    "convert_model": lambda: models.convert_model(
+        base_model=BaseModelType.StableDiffusion1,
+        model_type=ModelType.Lora,
+        model_name=LORA_CONFIG["model_name"],
+        convert_dest_directory=None,
+    ),
+    "merge_models": lambda: models.merge_models(
+        body=models.MergeModelsBody(model_names=["a", "b"], merged_model_name="a+b", interp=None),
+        base_model=BaseModelType.StableDiffusion1,
+    ),
+    "sync_to_config": lambda: models.sync_to_config(),
+}
+
+
+MUTATING_METHODS = [
+    "rename_model",
+    "update_model",
+    "heuristic_import",
+    "add_model",
+    "del_model",
+    "convert_model",
+    "merge_models",
+    "sync_to_config",
+]
+
+
+@pytest.mark.parametrize("fails", [False, True], ids=["succeeds", "fails"])
+@pytest.mark.parametrize("route", MUTATING_ROUTES.keys())
+def test_mutating_routes_clear_models_cache(mock_model_manager: MockModelManager, route: str, fails: bool):
+    """The cache must be cleared even when the model manager call fails, since it may have partially applied."""
+    asyncio.run(models._list_models(None, None))
+    assert models._models_cache != {}
+
+    if fails:
+
+        def raise_not_found(*args, **kwargs):
+            raise ModelNotFoundException("partially applied")
+
+        for method in MUTATING_METHODS:
+            setattr(mock_model_manager, method, raise_not_found)
+
+        with pytest.raises((HTTPException, ModelNotFoundException)):
+            asyncio.run(MUTATING_ROUTES[route]())
+    else:
+        asyncio.run(MUTATING_ROUTES[route]())
+
+    assert models._models_cache == {}
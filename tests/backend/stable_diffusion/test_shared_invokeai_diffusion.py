@@ -0,0 +1,49 @@
+import pytest
+import torch
+
+from invokeai.backend.stable_diffusion.diffusion.shared_invokeai_diffusion import InvokeAIDiffuserComponent
+
+
+def reference_concat_conditionings_for_batch(unconditioning, conditioning):
+    """The original pad-then-torch.cat implementation of _concat_conditionings_for_batch."""
+    if unconditioning.shape[1] == conditioning.shape[1]:
+        return torch.cat([unconditioning, conditioning]), None
+
+    max_len = max(unconditioning.shape[1], conditioning.shape[1])
+    padded = []
+    masks = []
+    for cond in [unconditioning, conditioning]:
+        mask = torch.ones((cond.shape[0], cond.shape[1]), dtype=cond.dtype)
+        if cond.shape[1] < max_len:
+            pad_len = max_len - cond.shape[1]
+            mask = torch.cat([mask, torch.zeros((cond.shape[0], pad_len), dtype=cond.dtype)], dim=1)
+            cond = torch.cat([cond, torch.zeros((cond.shape[0], pad_len, cond.shape[2]), dtype=cond.dtype)], dim=1)
+        padded.append(cond)
+        masks.append(mask)
+    return torch.cat(padded), torch.cat(masks)
+
+
+@pytest.mark.parametrize(
+    ["uc_len", "c_len"],
+    [
+        (77, 154),  # unconditioning shorter than conditioning
+        (231, 77),  # unconditioning longer than conditioning
+        (77, 77),  # equal lengths
+    ],
+)
+def test_concat_conditionings_for_batch(uc_len: int, c_len: int):
+    """Test that _concat_conditionings_for_batch(...) matches the original pad-then-concatenate implementation."""
+    torch.manual_seed(0)
+    unconditioning = torch.randn((1, uc_len, 768))
+    conditioning = torch.randn((1, c_len, 768))
+    diffuser = InvokeAIDiffuserComponent(model=None, model_forward_callback=None)
+
+    both_conditionings, encoder_attention_mask = diffuser._concat_conditionings_for_batch(unconditioning, conditioning)
+    expected_conditionings, expected_mask = reference_concat_conditionings_for_batch(unconditioning, conditioning)
+
+    assert torch.equal(both_conditionings, expected_conditionings)
+    if uc_len == c_len:
+        assert encoder_attention_mask is None
+    else:
+        assert encoder_attention_mask.dtype == expected_mask.dtype
+        assert torch.equal(encoder_attention_mask, expected_mask)